@@ -8,14 +8,18 @@ import sys
 from typing import List, Type, Tuple
 
 from .common import PSChannel, VChannel, IChannel, TChannel
-from .common import ConfigException
-from .curvetracer import run_oc, run_tc
-from .daq6510 import DAQ6510
-from .nge103b import NGE103B
+from .curvetracer import run_oc, run_tc, run_monitor
+from .drivers import load_ps_driver, load_daq_driver
+from .rawlog import open_raw_logger
 
-import matplotlib.pyplot as plt
-import numpy as np
-from scipy.interpolate import CubicSpline
+# name -> (function, description, required argument)
+COMMANDS = {}
+
+def command(name:str, description:str, requires:str=None):
+    def decorator(f):
+        COMMANDS[name] = (f, description, requires)
+        return f
+    return decorator
 
 def parse_config_for_device(config):
     return (config['device']['name'],
@@ -23,11 +27,8 @@ def parse_config_for_device(config):
             float(config['device']['igmax']))
 
 def parse_config_for_ps(config):
-    if config['ps']['type'] == 'nge103b':
-        ps = NGE103B('nge103.z54.org')
-
-    else:
-        raise ConfigException('unknown PowerSupply type')
+    ps_class = load_ps_driver(config['ps']['type'])
+    ps = ps_class(config['ps'].get('host', 'nge103.z54.org'))
 
     ps_vds = ps.get_channel(int(config['ps']['vds_chno']))
     ps_vgs = ps.get_channel(int(config['ps']['vgs_chno']))
@@ -38,11 +39,8 @@ def parse_config_for_ps(config):
     return ps, ps_vds, ps_vgs, delay_after_ps_on
 
 def parse_config_for_daq(config):
-    if config['daq']['type'] == 'daq6510':
-        daq = DAQ6510('daq6510.z54.org')
-
-    else:
-        raise ConfigException('unknown DAQ type')
+    daq_class = load_daq_driver(config['daq']['type'])
+    daq = daq_class(config['daq'].get('host', 'daq6510.z54.org'))
 
     dmm_vds = daq.get_voltage_channel(int(config['daq']['vds_chno']))
     dmm_vgs = daq.get_voltage_channel(int(config['daq']['vgs_chno']))
@@ -55,6 +53,8 @@ def parse_config_for_daq(config):
 
     return daq, dmm_vds, dmm_vgs, dmm_id, dmm_t
 
+@command('oc', 'measure output characteristic (vds vs. id)',
+         requires='config_file')
 def command_oc(args):
     config = configparser.ConfigParser()
     config.read(args.config_file)
@@ -73,19 +73,24 @@ def command_oc(args):
     tcon = float(config['test.oc']['tcon'])
 
     try:
-        with open('%s.oc' % dname, 'w') as output_file:
+        # raw logger is opened first, so an error does not empty the output file
+        with open_raw_logger(args.raw_file) as logger, \
+             open('%s.oc' % dname, 'w') as output_file:
             print('oc', file=output_file)
             print(dname, file=output_file)
             run_oc(output_file,
                    vgs_range, vds_range,
                    tmax, tcon, idmax, igmax,
                    ps_vds, ps_vgs, delay_after_ps_on,
-                   dmm_vds, dmm_vgs, dmm_id, dmm_t)
+                   dmm_vds, dmm_vgs, dmm_id, dmm_t,
+                   logger)
     finally:
         if (hasattr(ps, 'turn_all_channels_off') and
             callable(ps.turn_all_channels_off)):
             ps.turn_all_channels_off()
 
+@command('tc', 'measure transfer characteristic (vgs vs. id)',
+         requires='config_file')
 def command_tc(args):
     config = configparser.ConfigParser()
     config.read(args.config_file)
@@ -104,148 +109,162 @@ def command_tc(args):
     tcon = float(config['test.tc']['tcon'])
 
     try:
-        with open('%s.tc' % dname, 'w') as output_file:
+        # raw logger is opened first, so an error does not empty the output file
+        with open_raw_logger(args.raw_file) as logger, \
+             open('%s.tc' % dname, 'w') as output_file:
             print('tc', file=output_file)
             print(dname, file=output_file)
             run_tc(output_file,
                    vds_range, vgs_range,
                    tmax, tcon, idmax, igmax,
                    ps_vds, ps_vgs, delay_after_ps_on,
-                   dmm_vds, dmm_vgs, dmm_id, dmm_t)
+                   dmm_vds, dmm_vgs, dmm_id, dmm_t,
+                   logger)
     finally:
         if (hasattr(ps, 'turn_all_channels_off') and
             callable(ps.turn_all_channels_off)):
             ps.turn_all_channels_off()
 
-def command_plot_oc(f, output_file):
-    dname = f.readline().strip()
-    dataset = {}
-    tmax = 0
-    while True:
-        line = f.readline()
-        if len(line) == 0:
-            break
-        line = line.strip().split()
-        line = [float(x) for x in line]
-        vgs = line[0]
-        if vgs not in dataset:
-            dataset[vgs] = [list(), list()]
-        vds = line[1]
-        id_measured = line[2] * 1000
-        vds_measured = line[3]
-        vgs_measured = line[4]
-        t_measured = line[5]
-        dataset[vgs][0].append(vds_measured)
-        dataset[vgs][1].append(id_measured)
-        tmax = max(tmax, t_measured)
-
-    fig, ax = plt.subplots()
-    xmin = 0
-    xmax = 0
-    ymin = 0
-    ymax = 0
-    colors = [
-        'b', 'c', 'g', 'm', 'r', 'y'
-    ]
-    for i, vgs in enumerate(sorted(dataset.keys())):
-        X = dataset[vgs][0]
-        Y = dataset[vgs][1]
-        xmin = min(xmin, min(X))
-        xmax = max(xmax, max(X))
-        ymin = min(ymin, min(Y))
-        ymax = max(ymax, max(Y))
-        ax.plot(X, Y, label='Vgs=%gV' % vgs, color=colors[i % len(colors)])
-
-    ax.set_xlabel('Vds (V)')
-    ax.set_xlim(xmin, xmax)
-    ax.set_ylabel('Id (mA)')
-    ax.set_ylim(ymin, ymax)
-    ax.set_title('%s Output Characteristic' % dname)
-    ax.legend()
-    if output_file is None:
-        plt.show()
-    else:
-        plt.savefig(output_file)
-
-def command_plot_tc(f, output_file, with_temp):
-    dname = f.readline().strip()
-    dataset = {}
-    tmax = 0
-    while True:
-        line = f.readline()
-        if len(line) == 0:
-            break
-        line = line.strip().split()
-        line = [float(x) for x in line]
-        vds = line[0]
-        if vds not in dataset:
-            dataset[vds] = [list(), list(), list()]
-        vgs = line[1]
-        id_measured = line[2] * 1000
-        vds_measured = line[3]
-        vgs_measured = line[4]
-        t_measured = line[5]
-        dataset[vds][0].append(vgs_measured)
-        dataset[vds][1].append(id_measured)
-        dataset[vds][2].append(t_measured)
-        tmax = max(tmax, t_measured)
-
-    fig, ax = plt.subplots()
-    ax2 = ax.twinx()
-    xmin = 0
-    xmax = 0
-    ymin = 0
-    ymax = 0
-    colors = [
-        'b', 'c', 'g', 'm', 'r', 'y'
-    ]
-    for i, vds in enumerate(sorted(dataset.keys())):
-        X = dataset[vds][0]
-        Y = dataset[vds][1]
-        T = dataset[vds][2]
-        xmin = min(xmin, min(X))
-        xmax = min(xmax, max(X))
-        ymin = min(ymin, min(Y))
-        ymax = max(ymax, max(Y))
-        if with_temp:
-            ax.plot(X, T, color=colors[i % len(colors)], linestyle='dotted')
-        ax2.plot(X, Y, label='Vds=%gV' % vds, color=colors[i % len(colors)])
-
-    ax2.set_ylabel('Id (mA)')
-    ax2.set_ylim(ymin, ymax)
-    ax.set_xlabel('Vgs (V)')
-    ax.set_xlim(xmin, xmax)
-    ax.set_ylabel('Temperature (C)')
-    ax.set_ylim(20, tmax)
-    ax.set_title('%s Transfer Characteristic' % dname)
-    ax2.legend()
-    if output_file is None:
-        plt.show()
-    else:
-        plt.savefig(output_file)
+@command('monitor', 'hold the bias point and monitor (id, vds, vgs, t vs. time)',
+         requires='config_file')
+def command_monitor(args):
+    config = configparser.ConfigParser()
+    config.read(args.config_file)
+
+    dname, idmax, igmax = parse_config_for_device(config)
+    ps, ps_vds, ps_vgs, delay_after_ps_on = parse_config_for_ps(config)
+    daq, dmm_vds, dmm_vgs, dmm_id, dmm_t = parse_config_for_daq(config)
+
+    vds = float(config['test.monitor']['vds'])
+    vgs = float(config['test.monitor']['vgs'])
+    duration = float(config['test.monitor']['duration'])
+    interval = float(config['test.monitor']['interval'])
+    display_interval = float(config['test.monitor']['display_interval'])
+    tmax = float(config['test.monitor']['tmax'])
+    id_excursion = float(config['test.monitor']['id_excursion'])
+    id_reference = config['test.monitor'].get('id_reference')
+    if id_reference is not None:
+        id_reference = float(id_reference)
+
+    try:
+        # raw logger is opened first, so an error does not empty the output file
+        with open_raw_logger(args.raw_file) as logger, \
+             open('%s.mon' % dname, 'w') as output_file:
+            print('mon', file=output_file)
+            print(dname, file=output_file)
+            trip = run_monitor(output_file,
+                               vds, vgs,
+                               duration, interval, display_interval,
+                               tmax, id_excursion, id_reference,
+                               idmax, igmax,
+                               ps_vds, ps_vgs, delay_after_ps_on,
+                               dmm_vds, dmm_vgs, dmm_id, dmm_t,
+                               logger)
+    finally:
+        if (hasattr(ps, 'turn_all_channels_off') and
+            callable(ps.turn_all_channels_off)):
+            ps.turn_all_channels_off()
 
+    if trip is not None:
+        print('tripped: %s' % trip, file=sys.stderr)
+        sys.exit(2)
+
+@command('plot', 'plot oc or tc data generated by oc and tc commands',
+         requires='input_file')
 def command_plot(args):
-    with open(args.input_file, 'r') as f:
-        line = f.readline().strip()
-        if line == 'oc':
-            command_plot_oc(f, args.output_file)
+    if args.jobs is not None and args.jobs < 1:
+        print('plot requires jobs to be at least 1')
+        sys.exit(1)
+
+    # matplotlib is only imported when plotting
+    # batch plots are headless, so Agg is selected before pyplot is imported
+    if args.batch:
+        import matplotlib
+        matplotlib.use('Agg')
+    from .plot import plot, plot_batch
+    if args.batch:
+        plot_batch(args.input_file, args.output_file,
+                   args.format, args.temp, args.jobs)
+    else:
+        plot(args.input_file, args.output_file, args.temp)
+
+@command('compare', 'compare oc or tc data of devices to a reference',
+         requires='input_file')
+def command_compare(args):
+    # numpy and scipy are only imported when comparing
+    from .analysis import compare, curve_kind
+    from .datafile import find_inputs
+    if args.devices is None:
+        print('compare requires devices')
+        sys.exit(1)
 
-        elif line == 'tc':
-            command_plot_tc(f, args.output_file, args.temp)
+    try:
+        kind = curve_kind(args.input_file)
+    except (OSError, ValueError) as e:
+        print('%s cannot be compared: %s' % (args.input_file, e),
+              file=sys.stderr)
+        sys.exit(1)
 
-        else:
-            return
+    # devices that cannot be compared are reported and skipped
+    device_files = []
+    for device_file in find_inputs(args.devices):
+        try:
+            device_kind = curve_kind(device_file)
+        except (OSError, ValueError) as e:
+            print('%s cannot be compared: %s' % (device_file, e),
+                  file=sys.stderr)
+            continue
+
+        if device_kind != kind:
+            print('%s does not contain %s data' % (device_file, kind),
+                  file=sys.stderr)
+            continue
+
+        device_files.append(device_file)
+
+    results = compare(args.input_file, device_files)
+    label = 'Vgs' if kind == 'oc' else 'Vds'
+    for i, device_file in enumerate(device_files):
+        line = [device_file]
+        for key, (rms, maxdev) in results.items():
+            line.append('%s=%gV rms=%gmA max=%gmA' % (label,
+                                                       key,
+                                                       rms[i],
+                                                       maxdev[i]))
+        print(' '.join(line))
+
+@command('help', 'show this list of commands')
+def command_help(args):
+    print('Available commands are:')
+    for name, (f, description, requires) in COMMANDS.items():
+        print('  - %s: %s' % (name, description))
 
 def main():
     parser = argparse.ArgumentParser(
         prog='curvetracer',
         description='JFET curvetracer using LXI capable PowerSupply and DMM DAQ')
+    parser.add_argument('-b', '--batch',
+                        default=False,
+                        action='store_true',
+                        help='plot all files matching input file glob pattern '
+                        'or listed in @manifest, output file is the output directory')
     parser.add_argument('-c', '--config-file',
                         help='config file')
+    parser.add_argument('-d', '--devices',
+                        help='files to compare, glob pattern or @manifest')
+    parser.add_argument('-f', '--format',
+                        default='png',
+                        choices=['png', 'svg', 'pdf'],
+                        help='batch plot output format')
     parser.add_argument('-i', '--input-file',
                         help='input file')
+    parser.add_argument('-j', '--jobs',
+                        type=int,
+                        help='number of batch plot processes, default is number of CPUs')
     parser.add_argument('-o', '--output-file',
                         help='output file')
+    parser.add_argument('-r', '--raw-file',
+                        help='raw sample file (.h5, .hdf5 or .parquet)')
     parser.add_argument('-t', '--temp',
                         default=False,
                         action='store_true',
@@ -253,36 +272,16 @@ def main():
     parser.add_argument('command',
                         help='operation, use help command for more info')
     args = parser.parse_args()
-    if args.command == 'oc':
-        if args.config_file is None:
-            print('oc requires config file')
-            sys.exit(1)
-
-        command_oc(args)
-
-    elif args.command == 'tc':
-        if args.config_file is None:
-            print('tc requires config file')
-            sys.exit(1)
-
-        command_tc(args)
-
-    elif args.command == 'plot':
-        if args.input_file is None:
-            print('plot requires input file')
-            sys.exit(1)
-
-        command_plot(args)
-
-    elif args.command == 'help':
-        print('Available commands are:')
-        print('  - oc: measure output characteristic (vds vs. id)')
-        print('  - tc: measure transfer characteristic (vgs vs. id)')
-        print('  - plot: plot oc or tc data generated by oc and tc commands')
-
-    else:
+    if args.command not in COMMANDS:
         parser.print_help()
         sys.exit(1)
 
+    f, description, requires = COMMANDS[args.command]
+    if requires is not None and getattr(args, requires) is None:
+        print('%s requires %s' % (args.command, requires.replace('_', ' ')))
+        sys.exit(1)
+
+    f(args)
+
 if __name__ == '__main__':
     main()
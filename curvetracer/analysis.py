@@ -0,0 +1,104 @@
+# SPDX-FileCopyrightText: 2024 Mete Balci
+#
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+from functools import lru_cache
+import os
+from typing import Dict, List, Tuple
+
+import numpy as np
+from scipy.interpolate import CubicSpline
+
+from .datafile import read
+
+# the curves of a file are keyed by the stepped power supply value
+# Vgs for oc and Vds for tc, the x axis is the measured Vds or Vgs
+# and y is the measured Id in mA, same as the plots
+
+# large enough for a whole lot, parsed files are small
+@lru_cache(maxsize=4096)
+def _read(input_file:str, mtime:float):
+    data = read(input_file)
+    if data is None:
+        raise ValueError('%s is not an oc or tc file' % input_file)
+    return data
+
+@lru_cache(maxsize=16384)
+def _spline(input_file:str, mtime:float, key:float)->CubicSpline:
+    kind, dname, dataset, tmax = _read(input_file, mtime)
+    x = np.asarray(dataset[key][0])
+    y = np.asarray(dataset[key][1])
+    # measured x is not always strictly increasing
+    # so it is sorted and the values at the same x are averaged
+    x, inverse = np.unique(x, return_inverse=True)
+    y = np.bincount(inverse, weights=y) / np.bincount(inverse)
+    # e.g. an interrupted sweep, treated as a missing curve
+    if len(x) < 2:
+        return None
+    # not evaluated outside of the measured range
+    return CubicSpline(x, y, extrapolate=False)
+
+def curve_kind(input_file:str)->str:
+    return _read(input_file, os.path.getmtime(input_file))[0]
+
+def curve_keys(input_file:str)->List[float]:
+    kind, dname, dataset, tmax = _read(input_file,
+                                       os.path.getmtime(input_file))
+    return sorted(dataset.keys())
+
+def curve_spline(input_file:str, key:float)->CubicSpline:
+    # mtime is part of the cache key, so a rewritten file is read again
+    return _spline(input_file, os.path.getmtime(input_file), key)
+
+def curve_splines(input_file:str)->Dict[float, CubicSpline]:
+    # the file is read at most once, _spline finds it in the _read cache
+    mtime = os.path.getmtime(input_file)
+    kind, dname, dataset, tmax = _read(input_file, mtime)
+    return {key: _spline(input_file, mtime, key)
+            for key in sorted(dataset.keys())}
+
+def distances(reference:np.ndarray, curves:np.ndarray)->Tuple[np.ndarray, np.ndarray]:
+    # reference is (points,), curves is (N, points)
+    # NaN (outside of the measured range) points are not used
+    d = curves - reference[np.newaxis, :]
+    valid = ~np.isnan(d)
+    count = valid.sum(axis=1)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        rms = np.sqrt(np.where(valid, d * d, 0).sum(axis=1) / count)
+    maxdev = np.where(valid, np.abs(d), -np.inf).max(axis=1)
+    maxdev[count == 0] = np.nan
+    return rms, maxdev
+
+def compare(reference_file:str,
+            device_files:List[str],
+            points:int=200)->Dict[float, Tuple[np.ndarray, np.ndarray]]:
+    """Compares the curves of devices to the curves of reference.
+
+    Returns RMS and maximum deviation of each device for each curve of
+    reference, computed on a grid of points over the measured range of the
+    reference curve. A device without the curve, or with a curve of less
+    than 2 measured points, has NaN distances. All files have to be of the
+    same kind (oc or tc).
+    """
+    # each file is read once here, not for every curve, so the caches do
+    # not have to hold the whole lot
+    reference_splines = curve_splines(reference_file)
+    device_splines = [curve_splines(device_file)
+                      for device_file in device_files]
+
+    results = {}
+    for key, reference in reference_splines.items():
+        if reference is None:
+            nan = np.full(len(device_files), np.nan)
+            results[key] = (nan, nan.copy())
+            continue
+
+        grid = np.linspace(reference.x[0], reference.x[-1], points)
+        curves = np.full((len(device_files), points), np.nan)
+        for i, splines in enumerate(device_splines):
+            spline = splines.get(key)
+            if spline is not None:
+                curves[i] = spline(grid)
+        results[key] = distances(reference(grid), curves)
+
+    return results
@@ -10,12 +10,15 @@ import time
 from typing import List, Type, Tuple
 
 from .common import PSChannel, VChannel, IChannel, TChannel
+from .rawlog import NullLogger
+from .ringbuffer import MultiResolutionBuffer
 
-def median(f):
+def median(f, logger=NullLogger(), channel:str=''):
     v = []
-    v.append(f())
-    v.append(f())
-    v.append(f())
+    for i in range(3):
+        value = f()
+        logger.log('sample', channel, value)
+        v.append(value)
     return sorted(v)[1]
 
 def run_oc(output_file,
@@ -31,17 +34,20 @@ def run_oc(output_file,
            dmm_vds:Type[VChannel],
            dmm_vgs:Type[VChannel],
            dmm_id:Type[IChannel],
-           dmm_t:Type[TChannel])->None:
+           dmm_t:Type[TChannel],
+           logger=NullLogger())->None:
 
     vds_start, vds_fine_stop, vds_fine_step, vds_stop, vds_step = vds_range
 
     def ps_off():
         ps_vgs.state = False
         ps_vds.state = False
+        logger.log('state', 'ps', 0)
 
     def ps_on():
         ps_vgs.state = True
         ps_vds.state = True
+        logger.log('state', 'ps', 1)
 
     ps_off()
     ps_vds.current = max_id
@@ -49,23 +55,26 @@ def run_oc(output_file,
     try:
         for vgs in vgs_range:
             ps_vgs.voltage = vgs
+            logger.log('setpoint', 'vgs', vgs)
             while True:
-                t_value = median(lambda: dmm_t.temperature)
+                t_value = median(lambda: dmm_t.temperature, logger, 't')
                 if t_value < tcon:
                     break
                 else:
+                    logger.log('thermal_wait', 't', t_value)
                     print('%fC' % t_value, file=sys.stderr)
                     time.sleep(2)
 
             vds = vds_start
             while vds <= vds_stop:
                 ps_vds.voltage = vds
+                logger.log('setpoint', 'vds', vds)
 
                 ps_on()
-                id_value = median(lambda: dmm_id.current)
-                vds_value = median(lambda: dmm_vds.voltage)
-                vgs_value = median(lambda: dmm_vgs.voltage)
-                t_value = median(lambda: dmm_t.temperature)
+                id_value = median(lambda: dmm_id.current, logger, 'id')
+                vds_value = median(lambda: dmm_vds.voltage, logger, 'vds')
+                vgs_value = median(lambda: dmm_vgs.voltage, logger, 'vgs')
+                t_value = median(lambda: dmm_t.temperature, logger, 't')
                 ps_off()
 
                 print('%g %g %g %g %g %g' % (-vgs,
@@ -80,6 +89,7 @@ def run_oc(output_file,
                     ((vds_value > 1.05 * vds) or
                      (vds_value < 0.95 * vds))):
                     # retry
+                    logger.log('retry', 'vds', vds_value)
                     continue
 
                 # if measured value is not +-5% retry
@@ -87,6 +97,7 @@ def run_oc(output_file,
                     ((math.fabs(vgs_value) > math.fabs(1.05 * vgs)) or
                      (math.fabs(vgs_value) < math.fabs(0.95 * vgs)))):
                     # retry
+                    logger.log('retry', 'vgs', vgs_value)
                     continue
 
                 print('%g %g %g %g %g %g' % (-vgs,
@@ -96,11 +107,13 @@ def run_oc(output_file,
                                              vgs_value,
                                              t_value),
                       file=output_file)
+                logger.log('accept')
 
                 if t_value > tmax:
                     print('powering off to cool down...', file=sys.stderr)
                     while t_value > tcon:
                         t_value = dmm_t.temperature
+                        logger.log('thermal_wait', 't', t_value)
                         print('%fC' % t_value, file=sys.stderr)
                         time.sleep(2)
 
@@ -126,17 +139,20 @@ def run_tc(output_file,
            dmm_vds:Type[VChannel],
            dmm_vgs:Type[VChannel],
            dmm_id:Type[IChannel],
-           dmm_t:Type[TChannel])->None:
+           dmm_t:Type[TChannel],
+           logger=NullLogger())->None:
 
     vgs_start, vgs_fine_stop, vgs_fine_step, vgs_stop, vgs_step = vgs_range
 
     def ps_off():
         ps_vgs.state = False
         ps_vds.state = False
+        logger.log('state', 'ps', 0)
 
     def ps_on():
         ps_vgs.state = True
         ps_vds.state = True
+        logger.log('state', 'ps', 1)
         time.sleep(delay_after_ps_on)
 
     ps_off()
@@ -145,23 +161,26 @@ def run_tc(output_file,
     try:
         for vds in vds_range:
             ps_vds.voltage = vds
+            logger.log('setpoint', 'vds', vds)
             while True:
-                t_value = median(lambda: dmm_t.temperature)
+                t_value = median(lambda: dmm_t.temperature, logger, 't')
                 if t_value < tcon:
                     break
                 else:
+                    logger.log('thermal_wait', 't', t_value)
                     print('%fC' % t_value, file=sys.stderr)
                     time.sleep(2)
 
             vgs = vgs_start
             while vgs >= vgs_stop:
                 ps_vgs.voltage = vgs
+                logger.log('setpoint', 'vgs', vgs)
 
                 ps_on()
-                id_value = median(lambda: dmm_id.current)
-                vds_value = median(lambda: dmm_vds.voltage)
-                vgs_value = median(lambda: dmm_vgs.voltage)
-                t_value = median(lambda: dmm_t.temperature)
+                id_value = median(lambda: dmm_id.current, logger, 'id')
+                vds_value = median(lambda: dmm_vds.voltage, logger, 'vds')
+                vgs_value = median(lambda: dmm_vgs.voltage, logger, 'vgs')
+                t_value = median(lambda: dmm_t.temperature, logger, 't')
                 ps_off()
 
                 print('%g %g %g %g %g %g' % (vds,
@@ -176,6 +195,7 @@ def run_tc(output_file,
                     ((vds_value > 1.05 * vds) or
                      (vds_value < 0.95 * vds))):
                     # retry
+                    logger.log('retry', 'vds', vds_value)
                     continue
 
                 # if measured value is not +-5% retry
@@ -183,6 +203,7 @@ def run_tc(output_file,
                     ((math.fabs(vgs_value) > math.fabs(1.05 * vgs)) or
                      (math.fabs(vgs_value) < math.fabs(0.95 * vgs)))):
                     # retry
+                    logger.log('retry', 'vgs', vgs_value)
                     continue
 
                 print('%g %g %g %g %g %g' % (vds,
@@ -192,11 +213,13 @@ def run_tc(output_file,
                                              vgs_value,
                                              t_value),
                       file=output_file)
+                logger.log('accept')
 
                 if t_value > tmax:
                     print('powering off to cool down...', file=sys.stderr)
                     while t_value > tcon:
-                        t_value = median(dmm_t.temperature)
+                        t_value = median(lambda: dmm_t.temperature, logger, 't')
+                        logger.log('thermal_wait', 't', t_value)
                         print('%fC' % t_value, file=sys.stderr)
                         time.sleep(2)
 
@@ -208,3 +231,148 @@ def run_tc(output_file,
 
     finally:
         ps_off()
+
+# a smaller Id reference is too close to zero for a relative excursion
+ID_REFERENCE_MIN = 1e-6
+
+def check_id_reference(id_reference:float, id_excursion:float)->float:
+    # returns id_excursion, 0 if the check is disabled
+    if (id_excursion > 0) and (math.fabs(id_reference) < ID_REFERENCE_MIN):
+        print('Id reference %g is too close to zero, '
+              'Id excursion check is disabled' % id_reference,
+              file=sys.stderr)
+        return 0
+    return id_excursion
+
+def run_monitor(output_file,
+                vds:float,
+                vgs:float,
+                duration:float,
+                interval:float,
+                display_interval:float,
+                tmax:float,
+                id_excursion:float,
+                id_reference:float,
+                max_id:float,
+                max_ig:float,
+                ps_vds:Type[PSChannel],
+                ps_vgs:Type[PSChannel],
+                delay_after_ps_on:float,
+                dmm_vds:Type[VChannel],
+                dmm_vgs:Type[VChannel],
+                dmm_id:Type[IChannel],
+                dmm_t:Type[TChannel],
+                logger=NullLogger())->str:
+
+    def ps_off():
+        ps_vgs.state = False
+        ps_vds.state = False
+        logger.log('state', 'ps', 0)
+
+    def ps_on():
+        ps_vgs.state = True
+        ps_vds.state = True
+        logger.log('state', 'ps', 1)
+        time.sleep(delay_after_ps_on)
+
+    # memory does not grow with duration
+    # data is written to output_file as it is measured
+    # and only the ring buffers are kept for the display
+    buffers = {
+        'id': MultiResolutionBuffer(),
+        'vds': MultiResolutionBuffer(),
+        'vgs': MultiResolutionBuffer(),
+        't': MultiResolutionBuffer(),
+    }
+
+    # excursion is relative to id_reference, if it is None, it is the mean
+    # Id of the first display_interval, so the turn on is not the reference
+    id_sum = 0.0
+    id_count = 0
+    if id_reference is not None:
+        id_excursion = check_id_reference(id_reference, id_excursion)
+
+    trip = None
+    ps_off()
+    ps_vds.current = max_id
+    ps_vgs.current = max_ig
+    ps_vds.voltage = vds
+    logger.log('setpoint', 'vds', vds)
+    ps_vgs.voltage = vgs
+    logger.log('setpoint', 'vgs', vgs)
+    try:
+        ps_on()
+        start = time.monotonic()
+        next_sample = start
+        next_display = start + display_interval
+        while True:
+            id_value = median(lambda: dmm_id.current, logger, 'id')
+            vds_value = median(lambda: dmm_vds.voltage, logger, 'vds')
+            vgs_value = median(lambda: dmm_vgs.voltage, logger, 'vgs')
+            t_value = median(lambda: dmm_t.temperature, logger, 't')
+            now = time.monotonic()
+            elapsed = now - start
+
+            print('%g %g %g %g %g %g %g' % (elapsed,
+                                            vds,
+                                            -vgs,
+                                            id_value,
+                                            vds_value,
+                                            vgs_value,
+                                            t_value),
+                  file=output_file)
+            logger.log('accept')
+
+            buffers['id'].append(elapsed, id_value)
+            buffers['vds'].append(elapsed, vds_value)
+            buffers['vgs'].append(elapsed, vgs_value)
+            buffers['t'].append(elapsed, t_value)
+
+            if t_value > tmax:
+                trip = 'T=%gC > tmax=%gC' % (t_value, tmax)
+
+            if id_reference is None:
+                id_sum = id_sum + id_value
+                id_count = id_count + 1
+                if elapsed >= display_interval:
+                    id_reference = id_sum / id_count
+                    print('Id reference is %g' % id_reference, file=sys.stderr)
+                    id_excursion = check_id_reference(id_reference,
+                                                      id_excursion)
+            elif ((id_excursion > 0) and
+                  (math.fabs(id_value - id_reference) >
+                   math.fabs(id_excursion * id_reference))):
+                trip = 'Id=%g is not within +-%g%% of %g' % (id_value,
+                                                            id_excursion * 100,
+                                                            id_reference)
+
+            if trip is not None:
+                logger.log('trip')
+                break
+
+            if now >= next_display:
+                output_file.flush()
+                status = ['%ds' % elapsed]
+                for name in ('id', 'vds', 'vgs', 't'):
+                    summary = buffers[name].summary(elapsed - display_interval)
+                    if summary is None:
+                        continue
+                    vmin, vmax, vmean = summary
+                    status.append('%s=%g [%g, %g]' % (name, vmean, vmin, vmax))
+                print(' '.join(status), file=sys.stderr)
+                next_display = now + display_interval
+
+            if (duration > 0) and (elapsed >= duration):
+                break
+
+            # do not try to catch up if a measurement took longer than interval
+            next_sample = max(next_sample + interval, now)
+            time.sleep(max(0, next_sample - time.monotonic()))
+
+    except KeyboardInterrupt:
+        print('stopped', file=sys.stderr)
+
+    finally:
+        ps_off()
+
+    return trip
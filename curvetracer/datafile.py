@@ -0,0 +1,92 @@
+# SPDX-FileCopyrightText: 2024 Mete Balci
+#
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+import glob
+
+def read_oc(f):
+    dname = f.readline().strip()
+    dataset = {}
+    tmax = 0
+    while True:
+        line = f.readline()
+        if len(line) == 0:
+            break
+        line = line.strip().split()
+        line = [float(x) for x in line]
+        vgs = line[0]
+        if vgs not in dataset:
+            dataset[vgs] = [list(), list()]
+        vds = line[1]
+        id_measured = line[2] * 1000
+        vds_measured = line[3]
+        vgs_measured = line[4]
+        t_measured = line[5]
+        dataset[vgs][0].append(vds_measured)
+        dataset[vgs][1].append(id_measured)
+        tmax = max(tmax, t_measured)
+
+    return dname, dataset, tmax
+
+def read_tc(f):
+    dname = f.readline().strip()
+    dataset = {}
+    tmax = 0
+    while True:
+        line = f.readline()
+        if len(line) == 0:
+            break
+        line = line.strip().split()
+        line = [float(x) for x in line]
+        vds = line[0]
+        if vds not in dataset:
+            dataset[vds] = [list(), list(), list()]
+        vgs = line[1]
+        id_measured = line[2] * 1000
+        vds_measured = line[3]
+        vgs_measured = line[4]
+        t_measured = line[5]
+        dataset[vds][0].append(vgs_measured)
+        dataset[vds][1].append(id_measured)
+        dataset[vds][2].append(t_measured)
+        tmax = max(tmax, t_measured)
+
+    return dname, dataset, tmax
+
+def read(input_file):
+    with open(input_file, 'r') as f:
+        line = f.readline().strip()
+        if line == 'oc':
+            return ('oc',) + read_oc(f)
+
+        elif line == 'tc':
+            return ('tc',) + read_tc(f)
+
+        else:
+            return None
+
+def read_kind(input_file):
+    # oc or tc, None for other files
+    with open(input_file, 'r') as f:
+        line = f.readline().strip()
+    if line == 'oc' or line == 'tc':
+        return line
+    else:
+        return None
+
+def find_inputs(pattern:str):
+    # @file is a manifest, one file name or glob pattern per line
+    if pattern.startswith('@'):
+        with open(pattern[1:], 'r') as f:
+            patterns = [line.strip() for line in f]
+        patterns = [p for p in patterns if len(p) > 0 and not p.startswith('#')]
+    else:
+        patterns = [pattern]
+
+    input_files = []
+    for p in patterns:
+        for input_file in sorted(glob.glob(p)):
+            if input_file not in input_files:
+                input_files.append(input_file)
+
+    return input_files
@@ -0,0 +1,52 @@
+# SPDX-FileCopyrightText: 2024 Mete Balci
+#
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+import importlib
+
+from .common import ConfigException
+
+# built-in drivers are referenced by module and class name, so the
+# driver module (and vxi11) is imported only when the driver is used
+# third party drivers are registered as entry points in these groups
+PS_DRIVERS = {
+    'nge103b': '.nge103b:NGE103B',
+}
+
+DAQ_DRIVERS = {
+    'daq6510': '.daq6510:DAQ6510',
+}
+
+PS_ENTRY_POINT_GROUP = 'curvetracer.ps'
+DAQ_ENTRY_POINT_GROUP = 'curvetracer.daq'
+
+def _find_entry_point(group:str, name:str):
+    # importlib.metadata is slow to import, so it is not imported at startup
+    from importlib.metadata import entry_points
+    eps = entry_points()
+    if hasattr(eps, 'select'):
+        eps = eps.select(group=group, name=name)
+    else:
+        eps = [ep for ep in eps.get(group, []) if ep.name == name]
+    for ep in eps:
+        return ep
+    return None
+
+def _load(drivers, group:str, name:str, kind:str):
+    if name in drivers:
+        module_name, class_name = drivers[name].split(':')
+        module = importlib.import_module(module_name, package=__package__)
+        return getattr(module, class_name)
+
+    # entry points are only scanned for unknown types
+    ep = _find_entry_point(group, name)
+    if ep is None:
+        raise ConfigException('unknown %s type' % kind)
+
+    return ep.load()
+
+def load_ps_driver(name:str):
+    return _load(PS_DRIVERS, PS_ENTRY_POINT_GROUP, name, 'PowerSupply')
+
+def load_daq_driver(name:str):
+    return _load(DAQ_DRIVERS, DAQ_ENTRY_POINT_GROUP, name, 'DAQ')
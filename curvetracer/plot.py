@@ -0,0 +1,175 @@
+# SPDX-FileCopyrightText: 2024 Mete Balci
+#
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+from concurrent.futures import ProcessPoolExecutor
+import os
+import sys
+
+import matplotlib.pyplot as plt
+
+from .datafile import read, read_kind, find_inputs
+
+COLORS = [
+    'b', 'c', 'g', 'm', 'r', 'y'
+]
+
+def draw_oc(fig, dname, dataset, tmax):
+    ax = fig.subplots()
+    xmin = 0
+    xmax = 0
+    ymin = 0
+    ymax = 0
+    for i, vgs in enumerate(sorted(dataset.keys())):
+        X = dataset[vgs][0]
+        Y = dataset[vgs][1]
+        xmin = min(xmin, min(X))
+        xmax = max(xmax, max(X))
+        ymin = min(ymin, min(Y))
+        ymax = max(ymax, max(Y))
+        ax.plot(X, Y, label='Vgs=%gV' % vgs, color=COLORS[i % len(COLORS)])
+
+    ax.set_xlabel('Vds (V)')
+    ax.set_xlim(xmin, xmax)
+    ax.set_ylabel('Id (mA)')
+    ax.set_ylim(ymin, ymax)
+    ax.set_title('%s Output Characteristic' % dname)
+    ax.legend()
+
+def draw_tc(fig, dname, dataset, tmax, with_temp):
+    ax = fig.subplots()
+    ax2 = ax.twinx()
+    xmin = 0
+    xmax = 0
+    ymin = 0
+    ymax = 0
+    for i, vds in enumerate(sorted(dataset.keys())):
+        X = dataset[vds][0]
+        Y = dataset[vds][1]
+        T = dataset[vds][2]
+        xmin = min(xmin, min(X))
+        xmax = min(xmax, max(X))
+        ymin = min(ymin, min(Y))
+        ymax = max(ymax, max(Y))
+        if with_temp:
+            ax.plot(X, T, color=COLORS[i % len(COLORS)], linestyle='dotted')
+        ax2.plot(X, Y, label='Vds=%gV' % vds, color=COLORS[i % len(COLORS)])
+
+    ax2.set_ylabel('Id (mA)')
+    ax2.set_ylim(ymin, ymax)
+    ax.set_xlabel('Vgs (V)')
+    ax.set_xlim(xmin, xmax)
+    ax.set_ylabel('Temperature (C)')
+    ax.set_ylim(20, tmax)
+    ax.set_title('%s Transfer Characteristic' % dname)
+    ax2.legend()
+
+def draw(fig, data, with_temp):
+    kind, dname, dataset, tmax = data
+    if kind == 'oc':
+        draw_oc(fig, dname, dataset, tmax)
+
+    else:
+        draw_tc(fig, dname, dataset, tmax, with_temp)
+
+def plot(input_file, output_file, with_temp):
+    data = read(input_file)
+    if data is None:
+        return
+
+    fig = plt.figure()
+    draw(fig, data, with_temp)
+    if output_file is None:
+        plt.show()
+    else:
+        fig.savefig(output_file)
+    plt.close(fig)
+
+# the figure of a batch worker process
+# it is cleared and reused for every plot instead of creating a new one
+_template = None
+
+def _init_worker():
+    plt.switch_backend('Agg')
+
+def _render(job):
+    global _template
+    input_file, output_file, with_temp = job
+    # an error is returned, so one bad file does not stop the batch
+    try:
+        data = read(input_file)
+        if data is None:
+            return input_file, 'not an oc or tc file'
+
+        if _template is None:
+            _template = plt.figure()
+        else:
+            _template.clear()
+
+        draw(_template, data, with_temp)
+        _template.savefig(output_file)
+
+    except Exception as e:
+        return input_file, '%s: %s' % (type(e).__name__, e)
+
+    return input_file, None
+
+def output_file_name(input_file:str, kind:str, output_dir:str, fmt:str, with_temp:bool):
+    name = input_file
+    if output_dir is not None:
+        name = os.path.join(output_dir, os.path.basename(input_file))
+    # temperature is only shown on tc plots
+    if with_temp and kind == 'tc':
+        name = name + '.temp'
+    return '%s.%s' % (name, fmt)
+
+def is_up_to_date(input_file:str, output_file:str):
+    return (os.path.exists(output_file) and
+            os.path.getmtime(output_file) >= os.path.getmtime(input_file))
+
+def plot_batch(pattern:str, output_dir:str, fmt:str, with_temp:bool, jobs:int):
+    if jobs is None:
+        # cpu_count is None if it cannot be determined
+        jobs = os.cpu_count() or 1
+    elif jobs < 1:
+        raise ValueError('jobs has to be at least 1')
+
+    batch = []
+    outputs = {}
+    for input_file in find_inputs(pattern):
+        try:
+            kind = read_kind(input_file)
+        except (OSError, ValueError) as e:
+            print('%s failed: %s: %s' % (input_file, type(e).__name__, e),
+                  file=sys.stderr)
+            continue
+
+        if kind is None:
+            print('%s is not an oc or tc file' % input_file, file=sys.stderr)
+            continue
+
+        output_file = output_file_name(input_file, kind, output_dir, fmt, with_temp)
+        if is_up_to_date(input_file, output_file):
+            print('%s is up to date' % output_file)
+        else:
+            batch.append((input_file, output_file, with_temp))
+            outputs[input_file] = output_file
+
+    if len(batch) == 0:
+        return
+
+    if output_dir is not None:
+        os.makedirs(output_dir, exist_ok=True)
+
+    # a few chunks per worker, so workers stay busy without large chunks
+    chunksize = max(1, len(batch) // (jobs * 4))
+
+    with ProcessPoolExecutor(max_workers=jobs,
+                             initializer=_init_worker) as executor:
+        for input_file, error in executor.map(_render,
+                                              batch,
+                                              chunksize=chunksize):
+            if error is None:
+                print(outputs[input_file])
+            else:
+                print('%s failed: %s' % (input_file, error), file=sys.stderr)
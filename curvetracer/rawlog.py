@@ -0,0 +1,186 @@
+# SPDX-FileCopyrightText: 2024 Mete Balci
+#
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+import math
+import queue
+import sys
+import threading
+import time
+
+# every record is (t, event, channel, value)
+# t is time.monotonic(), start times are saved as file metadata
+# events:
+#   sample       a single raw reading of channel (id, vds, vgs, t)
+#   setpoint     a voltage programmed to channel (vds, vgs)
+#   state        power supply outputs turned on (1) or off (0)
+#   retry        measured value of channel not within +-5% of setpoint
+#   thermal_wait temperature read while waiting to cool down
+#   accept       measurement accepted and written to output file
+#   trip         monitor stopped because of a trip condition
+COLUMNS = [
+    ('t', 'f8'),
+    ('event', 'S16'),
+    ('channel', 'S8'),
+    ('value', 'f8'),
+]
+
+class NullLogger:
+    def log(self, event:str, channel:str='', value:float=math.nan)->None:
+        pass
+
+    def close(self)->None:
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+class HDF5Writer:
+    def __init__(self, path:str, chunk_size:int, metadata:dict)->None:
+        import h5py
+        import numpy as np
+        self.np = np
+        self.file = h5py.File(path, 'w')
+        for name, dtype in COLUMNS:
+            self.file.create_dataset(name,
+                                     shape=(0,),
+                                     maxshape=(None,),
+                                     dtype=dtype,
+                                     chunks=(chunk_size,),
+                                     compression='gzip',
+                                     shuffle=True)
+        for k, v in metadata.items():
+            self.file.attrs[k] = v
+
+    def write(self, records)->None:
+        n = len(records)
+        for (name, dtype), column in zip(COLUMNS, zip(*records)):
+            dataset = self.file[name]
+            dataset.resize(dataset.shape[0] + n, axis=0)
+            dataset[-n:] = self.np.array(column, dtype=dtype)
+        # so the file is readable up to here if the program is killed
+        self.file.flush()
+
+    def close(self)->None:
+        self.file.close()
+
+class ParquetWriter:
+    def __init__(self, path:str, metadata:dict)->None:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        self.pa = pa
+        self.schema = pa.schema([('t', pa.float64()),
+                                 ('event', pa.string()),
+                                 ('channel', pa.string()),
+                                 ('value', pa.float64())],
+                                metadata={k: str(v) for k, v in metadata.items()})
+        self.writer = pq.ParquetWriter(path, self.schema, compression='zstd')
+
+    def write(self, records)->None:
+        # each write is a row group
+        arrays = [self.pa.array(column, type=field.type)
+                  for field, column in zip(self.schema, zip(*records))]
+        self.writer.write_table(self.pa.Table.from_arrays(arrays,
+                                                          schema=self.schema))
+
+    def close(self)->None:
+        self.writer.close()
+
+class RawLogger(NullLogger):
+    """Logs records through a bounded queue to a writer thread.
+
+    log() never blocks, if the queue is full the record is dropped and
+    counted. Records are written when chunk_size records are collected
+    or at least every flush_interval seconds. The writer is opened in the constructor so a missing h5py or
+    pyarrow is reported before any measurement is made.
+    """
+
+    def __init__(self,
+                 path:str,
+                 queue_size:int=65536,
+                 chunk_size:int=4096,
+                 flush_interval:float=5.0)->None:
+        metadata = {'start_time': time.time(),
+                    'start_monotonic': time.monotonic()}
+        if path.endswith('.h5') or path.endswith('.hdf5'):
+            self.writer = HDF5Writer(path, chunk_size, metadata)
+        elif path.endswith('.parquet'):
+            self.writer = ParquetWriter(path, metadata)
+        else:
+            raise ValueError('raw file extension has to be .h5, .hdf5 or .parquet')
+
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.chunk_size = chunk_size
+        self.flush_interval = flush_interval
+        self.dropped = 0
+        # exception that stopped the writer thread
+        self.error = None
+        self.thread = threading.Thread(target=self.__run, daemon=True)
+        self.thread.start()
+
+    def log(self, event:str, channel:str='', value:float=math.nan)->None:
+        try:
+            self.queue.put_nowait((time.monotonic(), event, channel, value))
+        except queue.Full:
+            self.dropped = self.dropped + 1
+
+    def __run(self)->None:
+        records = []
+        deadline = time.monotonic() + self.flush_interval
+        done = False
+        try:
+            while not done:
+                try:
+                    record = self.queue.get(
+                        timeout=max(0, deadline - time.monotonic()))
+                    if record is None:
+                        done = True
+                    else:
+                        records.append(record)
+                except queue.Empty:
+                    pass
+
+                # the deadline does not depend on how fast records arrive
+                if (done or
+                    (len(records) >= self.chunk_size) or
+                    (time.monotonic() >= deadline)):
+                    if len(records) > 0:
+                        self.writer.write(records)
+                        records = []
+                    deadline = time.monotonic() + self.flush_interval
+
+        except Exception as e:
+            self.error = e
+
+        finally:
+            try:
+                self.writer.close()
+            except Exception as e:
+                if self.error is None:
+                    self.error = e
+
+    def close(self)->None:
+        # the queue can be full and never drained if the writer thread
+        # has stopped with an error, so put does not wait forever
+        while self.thread.is_alive():
+            try:
+                self.queue.put(None, timeout=0.1)
+                break
+            except queue.Full:
+                pass
+        self.thread.join()
+        if self.error is not None:
+            print('raw logger failed, raw file is incomplete: %r' % self.error,
+                  file=sys.stderr)
+        if self.dropped > 0:
+            print('raw logger dropped %d records' % self.dropped,
+                  file=sys.stderr)
+
+def open_raw_logger(path:str):
+    if path is None:
+        return NullLogger()
+    else:
+        return RawLogger(path)
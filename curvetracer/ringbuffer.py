@@ -0,0 +1,73 @@
+# SPDX-FileCopyrightText: 2024 Mete Balci
+#
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+from collections import deque
+import math
+from typing import List, Optional, Tuple
+
+class MultiResolutionBuffer:
+    """Fixed size ring buffers of (t, min, max, mean) buckets.
+
+    Level n keeps the last size buckets of factors[n] samples each, so
+    coarser levels cover a longer time with the same memory. t is the time
+    of the first sample in the bucket.
+    """
+
+    def __init__(self, size:int=1000, factors:Tuple[int, ...]=(1, 10, 100, 1000))->None:
+        self.factors = factors
+        self.levels = [deque(maxlen=size) for factor in factors]
+        # bucket being filled for each level, [t, min, max, sum, count]
+        self.pending = [None] * len(factors)
+
+    def append(self, t:float, value:float)->None:
+        for i, factor in enumerate(self.factors):
+            bucket = self.pending[i]
+            if bucket is None:
+                bucket = [t, value, value, 0.0, 0]
+            bucket[1] = min(bucket[1], value)
+            bucket[2] = max(bucket[2], value)
+            bucket[3] = bucket[3] + value
+            bucket[4] = bucket[4] + 1
+            if bucket[4] == factor:
+                self.levels[i].append((bucket[0],
+                                       bucket[1],
+                                       bucket[2],
+                                       bucket[3] / factor))
+                bucket = None
+            self.pending[i] = bucket
+
+    def buckets(self, level:int)->List[Tuple[float, float, float, float]]:
+        return list(self.levels[level])
+
+    def summary(self, since:float)->Optional[Tuple[float, float, float]]:
+        # (min, max, mean) of samples since, None if there is none
+        # finest level still holding buckets older than since
+        # or if there is none, the level going back the longest
+        level = None
+        for i, buckets in enumerate(self.levels):
+            if len(buckets) > 0 and buckets[0][0] <= since:
+                level = i
+                break
+
+        if level is None:
+            level = min(range(len(self.levels)),
+                        key=lambda i: (self.levels[i][0][0]
+                                       if len(self.levels[i]) > 0
+                                       else math.inf))
+
+        # (min, max, sum, count) of buckets, including the one being filled
+        # so the newest samples are not missing on coarse levels
+        factor = self.factors[level]
+        buckets = [(b[1], b[2], b[3] * factor, factor)
+                   for b in self.levels[level] if b[0] >= since]
+        pending = self.pending[level]
+        if pending is not None and pending[0] >= since:
+            buckets.append((pending[1], pending[2], pending[3], pending[4]))
+
+        if len(buckets) == 0:
+            return None
+
+        return (min([b[0] for b in buckets]),
+                max([b[1] for b in buckets]),
+                sum([b[2] for b in buckets]) / sum([b[3] for b in buckets]))
@@ -0,0 +1,125 @@
+# SPDX-FileCopyrightText: 2024 Mete Balci
+#
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+import math
+import os
+
+import numpy as np
+import pytest
+
+from curvetracer import analysis
+
+def write_oc(path, curves, name='D'):
+    # curves is {vgs: [(vds_measured, id), ...]}
+    with open(path, 'w') as f:
+        print('oc', file=f)
+        print(name, file=f)
+        for vgs, points in curves.items():
+            for vds, i in points:
+                print('%g %g %g %g %g %g' % (vgs, vds, i, vds, vgs, 30),
+                      file=f)
+
+def line(offset=0.0, n=11):
+    # Id in A, analysis returns mA
+    return [(x, (x + offset) / 1000) for x in np.linspace(0, 10, n)]
+
+@pytest.fixture(autouse=True)
+def clear_caches():
+    analysis._read.cache_clear()
+    analysis._spline.cache_clear()
+
+def test_distances_masks_nan():
+    reference = np.array([0.0, 1.0, 2.0, 3.0])
+    curves = np.array([[0.0, 1.0, 2.0, 3.0],
+                       [1.0, 1.0, np.nan, 5.0],
+                       [np.nan, np.nan, np.nan, np.nan]])
+    rms, maxdev = analysis.distances(reference, curves)
+    assert rms[0] == 0
+    assert maxdev[0] == 0
+    assert rms[1] == pytest.approx(math.sqrt(5 / 3))
+    assert maxdev[1] == 2
+    assert math.isnan(rms[2])
+    assert math.isnan(maxdev[2])
+
+def test_compare(tmp_path):
+    reference = tmp_path / 'R.oc'
+    same = tmp_path / 'S.oc'
+    shifted = tmp_path / 'O.oc'
+    write_oc(reference, {0: line(), -1: line()})
+    write_oc(same, {0: line(), -1: line()})
+    write_oc(shifted, {0: line(0.5), -1: line()})
+    results = analysis.compare(str(reference), [str(same), str(shifted)])
+    assert sorted(results.keys()) == [-1, 0]
+    rms, maxdev = results[0]
+    assert rms == pytest.approx([0, 0.5])
+    assert maxdev == pytest.approx([0, 0.5])
+    rms, maxdev = results[-1]
+    assert rms == pytest.approx([0, 0])
+
+def test_compare_unsorted_and_duplicate_x(tmp_path):
+    reference = tmp_path / 'R.oc'
+    device = tmp_path / 'D.oc'
+    write_oc(reference, {0: line()})
+    points = line()
+    write_oc(device, {0: points[::-1] + [(5.0, 0.004), (5.0, 0.006)]})
+    rms, maxdev = analysis.compare(str(reference), [str(device)])[0]
+    assert rms[0] == pytest.approx(0, abs=1e-9)
+
+def test_compare_missing_and_single_point_curves(tmp_path):
+    reference = tmp_path / 'R.oc'
+    missing = tmp_path / 'M.oc'
+    single = tmp_path / 'P.oc'
+    write_oc(reference, {0: line(), -1: line()})
+    write_oc(missing, {0: line()})
+    write_oc(single, {0: line()[:1], -1: line()})
+    results = analysis.compare(str(reference), [str(missing), str(single)])
+    rms, maxdev = results[-1]
+    assert math.isnan(rms[0])
+    assert rms[1] == pytest.approx(0)
+    rms, maxdev = results[0]
+    assert rms[0] == pytest.approx(0)
+    assert math.isnan(rms[1])
+    assert math.isnan(maxdev[1])
+
+def test_compare_single_point_reference(tmp_path):
+    reference = tmp_path / 'R.oc'
+    device = tmp_path / 'D.oc'
+    write_oc(reference, {0: line()[:1]})
+    write_oc(device, {0: line()})
+    rms, maxdev = analysis.compare(str(reference), [str(device)])[0]
+    assert math.isnan(rms[0])
+    assert math.isnan(maxdev[0])
+
+def test_compare_reads_each_file_once(tmp_path, monkeypatch):
+    reads = []
+    read = analysis.read
+    def counting_read(input_file):
+        reads.append(input_file)
+        return read(input_file)
+    monkeypatch.setattr(analysis, 'read', counting_read)
+
+    reference = tmp_path / 'R.oc'
+    write_oc(reference, {v: line() for v in (0, -1, -2, -3)})
+    devices = []
+    for n in range(100):
+        device = tmp_path / ('D%d.oc' % n)
+        write_oc(device, {v: line() for v in (0, -1, -2, -3)})
+        devices.append(str(device))
+
+    analysis.compare(str(reference), devices)
+    assert len(reads) == 101
+
+def test_rewritten_file_is_read_again(tmp_path):
+    reference = tmp_path / 'R.oc'
+    device = tmp_path / 'D.oc'
+    write_oc(reference, {0: line()})
+    write_oc(device, {0: line()})
+    rms, maxdev = analysis.compare(str(reference), [str(device)])[0]
+    assert rms[0] == pytest.approx(0)
+    write_oc(device, {0: line(1.0)})
+    # make sure mtime changes even on coarse timestamp filesystems
+    stat = device.stat()
+    os.utime(device, (stat.st_atime, stat.st_mtime + 10))
+    rms, maxdev = analysis.compare(str(reference), [str(device)])[0]
+    assert rms[0] == pytest.approx(1.0)
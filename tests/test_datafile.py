@@ -0,0 +1,56 @@
+# SPDX-FileCopyrightText: 2024 Mete Balci
+#
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+from curvetracer.datafile import find_inputs, read, read_kind
+
+def touch(path, content='oc\nD\n'):
+    with open(path, 'w') as f:
+        f.write(content)
+
+def test_find_inputs_glob_is_sorted(tmp_path):
+    for name in ('B.oc', 'A.oc', 'C.tc'):
+        touch(tmp_path / name)
+    assert find_inputs(str(tmp_path / '*.oc')) == [str(tmp_path / 'A.oc'),
+                                                   str(tmp_path / 'B.oc')]
+
+def test_find_inputs_manifest(tmp_path):
+    for name in ('A.oc', 'B.oc', 'C.tc'):
+        touch(tmp_path / name)
+    manifest = tmp_path / 'lot.txt'
+    with open(manifest, 'w') as f:
+        print('# comment', file=f)
+        print('', file=f)
+        print('  %s  ' % (tmp_path / 'C.tc'), file=f)
+        print(tmp_path / '*.oc', file=f)
+        # duplicate of a file matched above
+        print(tmp_path / 'A.oc', file=f)
+        print(tmp_path / 'missing.oc', file=f)
+    assert find_inputs('@%s' % manifest) == [str(tmp_path / 'C.tc'),
+                                              str(tmp_path / 'A.oc'),
+                                              str(tmp_path / 'B.oc')]
+
+def test_read_kind(tmp_path):
+    touch(tmp_path / 'A.oc', 'oc\nD\n')
+    touch(tmp_path / 'A.tc', 'tc\nD\n')
+    touch(tmp_path / 'A.mon', 'mon\nD\n')
+    assert read_kind(str(tmp_path / 'A.oc')) == 'oc'
+    assert read_kind(str(tmp_path / 'A.tc')) == 'tc'
+    assert read_kind(str(tmp_path / 'A.mon')) is None
+
+def test_read_oc(tmp_path):
+    touch(tmp_path / 'A.oc',
+          'oc\nD\n'
+          '0 1 0.001 1.01 0 30\n'
+          '0 2 0.002 2.02 0 31\n'
+          '-1 1 0.0005 1 -1 32\n')
+    kind, dname, dataset, tmax = read(str(tmp_path / 'A.oc'))
+    assert kind == 'oc'
+    assert dname == 'D'
+    assert tmax == 32
+    assert dataset[0] == [[1.01, 2.02], [1.0, 2.0]]
+    assert dataset[-1] == [[1.0], [0.5]]
+
+def test_read_other_file_is_none(tmp_path):
+    touch(tmp_path / 'A.mon', 'mon\nD\n')
+    assert read(str(tmp_path / 'A.mon')) is None
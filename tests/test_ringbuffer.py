@@ -0,0 +1,48 @@
+# SPDX-FileCopyrightText: 2024 Mete Balci
+#
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+from curvetracer.ringbuffer import MultiResolutionBuffer
+
+def test_buckets_are_min_max_mean_of_factor_samples():
+    b = MultiResolutionBuffer(size=10, factors=(1, 3))
+    for t, v in enumerate([1, 5, 3, 2, 2, 8]):
+        b.append(t, v)
+    assert b.buckets(0) == [(0, 1, 1, 1), (1, 5, 5, 5), (2, 3, 3, 3),
+                            (3, 2, 2, 2), (4, 2, 2, 2), (5, 8, 8, 8)]
+    assert b.buckets(1) == [(0, 1, 5, 3), (3, 2, 8, 4)]
+
+def test_levels_have_fixed_size():
+    b = MultiResolutionBuffer(size=4, factors=(1, 10))
+    for t in range(1000):
+        b.append(t, t)
+    assert len(b.buckets(0)) == 4
+    assert len(b.buckets(1)) == 4
+    assert b.buckets(0)[0] == (996, 996, 996, 996)
+    assert b.buckets(1)[-1] == (990, 990, 999, 994.5)
+
+def test_summary_empty_is_none():
+    b = MultiResolutionBuffer()
+    assert b.summary(0) is None
+    b.append(0, 1)
+    assert b.summary(1) is None
+
+def test_summary_uses_finest_level_covering_since():
+    b = MultiResolutionBuffer(size=10, factors=(1, 10))
+    for t in range(100):
+        b.append(t, t)
+    # level 0 only holds 90..99
+    assert b.summary(95) == (95, 99, 97)
+    # level 1 holds 0..99 in buckets of 10
+    assert b.summary(50) == (50, 99, 74.5)
+
+def test_summary_includes_pending_bucket():
+    b = MultiResolutionBuffer(size=2, factors=(1, 10))
+    for t in range(25):
+        b.append(t, 0)
+    # newest samples are still in the pending bucket of level 1
+    b.append(25, 100)
+    vmin, vmax, vmean = b.summary(0)
+    assert vmin == 0
+    assert vmax == 100
+    assert vmean == 100 / 26